@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-import abc
 import dataclasses
 import typing
 import re
+import sys
+import zlib
 
 """Carousel Object Structure"""
 
@@ -11,69 +12,192 @@ import re
 class ParseError(Exception): pass
 
 
-class CosValue(abc.ABC):
+_WHITESPACE = b"\x00\x09\x0A\x0C\x0D\x20"
+_DELIMITERS = b"()<>[]{}/%"
+_HEX_DIGITS = b"0123456789abcdefABCDEF"
+
+# regex character classes built from the byte sets above
+_WS_CLASS = b"[" + re.escape(_WHITESPACE) + b"]"
+# regular characters are everything in the range ! to ~ except for delimiters
+_REGULAR_CLASS = rb"[^\x00-\x20\x7f-\xff" + re.escape(_DELIMITERS) + b"]"
+
+_WS = _WS_CLASS + b"*"
+# returns a match spanning all whitespace at the given position, use .end() to skip it
+_WS_END = re.compile(_WS).match
+
+
+def _compile_match(pattern: bytes) -> typing.Callable[[bytes, int], re.Match | None]:
+    """Return the match method of pattern preceded by optional whitespace.
+
+    The pattern is grouped, so that the whitespace also precedes every branch of a top-level alternation.
+    """
+    return re.compile(_WS + b"(?:" + pattern + b")").match
+
+
+def _unescape(string: bytes, marker: bytes, escapes: dict[bytes, bytes], width: int) -> bytes:
+    """Replace every marker followed by a code of the given width found in escapes with its value.
+
+    Markers that are not followed by a known code are kept as they are.
+    """
+    i = string.find(marker)
+    if i == -1:
+        return string
+
+    out = bytearray()
+    last = 0
+    while i != -1:
+        out += string[last:i]
+        replacement = escapes.get(string[i + 1:i + 1 + width])
+        if replacement is None:
+            out += marker
+            last = i + 1
+        else:
+            out += replacement
+            last = i + 1 + width
+        i = string.find(marker, last)
+    out += string[last:]
+
+    return bytes(out)
+
+
+# the code following a backslash in a literal string, an octal character code of up to three digits, an end of line
+# or any other byte
+_STRING_ESCAPE_CODE = re.compile(rb"[0-7]{1,3}|\r\n|[\s\S]").match
+# the replacement of every code _STRING_ESCAPE_CODE can match, the backslash is dropped before unknown bytes and
+# together with an end of line, high-order overflow of octal codes is ignored
+_STRING_ESCAPES = {
+    **{bytes((i,)): bytes((i,)) for i in range(256)},
+    **{b"%o" % i: bytes((i,)) for i in range(8)},
+    **{b"%02o" % i: bytes((i,)) for i in range(64)},
+    **{b"%03o" % i: bytes((i & 0xFF,)) for i in range(512)},
+    b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f",
+    b"\r\n": b"", b"\r": b"", b"\n": b"",
+}
+
+
+def _unescape_literal(string: bytes) -> bytes:
+    """Replace every backslash escape of a literal string with the bytes it stands for.
+
+    A backslash at the very end has nothing to escape and is kept.
+    """
+    i = string.find(b"\\")
+    if i == -1:
+        return string
+
+    out = bytearray()
+    last = 0
+    while i != -1:
+        out += string[last:i]
+        code = _STRING_ESCAPE_CODE(string, i + 1)
+        if code is None:
+            out += b"\\"
+            last = i + 1
+        else:
+            out += _STRING_ESCAPES[code.group()]
+            last = code.end()
+        i = string.find(b"\\", last)
+    out += string[last:]
+
+    return bytes(out)
+
+
+class CosValue:
+    __slots__ = ()
+
+    # regex matching the start of the value, its named groups identify the type in _LEXER
+    _PATTERN: typing.ClassVar[bytes]
+    # _PATTERN compiled with leading whitespace
+    _MATCH: typing.ClassVar[typing.Callable[[bytes, int], re.Match | None]]
+    # whether the value is or may contain a reference that replace_references has to resolve
+    _holds_references: typing.ClassVar[bool] = True
+
+    @classmethod
+    def parse(cls, buf: bytes, pos: int) -> tuple[typing.Self, int]:
+        """Return the COS value parsed from buf at pos and the position right after it."""
+        match = cls._MATCH(buf, pos)
+        if match is None:
+            raise ParseError(f"Could not parse {cls.__name__} from {buf[pos:]!r}.")
+
+        return cls._build(buf, match)
+
+    @classmethod
+    def _build(cls, buf: bytes, match: re.Match) -> tuple[typing.Self, int]:
+        """Return the COS value whose start was matched by _PATTERN and the position right after it."""
+        raise NotImplementedError
+
     @classmethod
-    @abc.abstractmethod
     def from_bytes(cls, string: bytes) -> tuple[typing.Self, bytes]:
         """Return the parsed COS value and the remaining string."""
-        raise ParseError
+        value, pos = cls.parse(string, 0)
+        return value, string[pos:]
 
     @property
-    @abc.abstractmethod
     def children(self) -> typing.Iterable[CosValue]:
-        ...
+        raise NotImplementedError
 
-    @abc.abstractmethod
-    def replace_references(self, references: dict[tuple[int, int], CosValue]) -> None:
-        ...
+    def replace_references(self, references: dict[tuple[int, int], CosValue], visited: set[int] | None = None) -> None:
+        """Replace nested references with the values they refer to.
+
+        visited holds the ids of the containers already walked, resolved values can refer back to them.
+        """
+        raise NotImplementedError
 
     def to_bytes(self) -> str:
         ...
 
 
 class _NoChildrenMixin:
+    __slots__ = ()
+
+    _holds_references: typing.ClassVar[bool] = False
+
     @property
     def children(self) -> typing.Iterable[CosValue]:
         return ()
 
-    def replace_references(self, references: dict[tuple[int, int], CosValue]) -> None:
+    def replace_references(self, references: dict[tuple[int, int], CosValue], visited: set[int] | None = None) -> None:
         pass
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True, frozen=True)
 class Null(_NoChildrenMixin, CosValue):
+    _PATTERN: typing.ClassVar[bytes] = rb"(?P<null>(?i:null))"
+    _MATCH: typing.ClassVar = _compile_match(_PATTERN)
+
     @classmethod
-    def from_bytes(cls, string: bytes) -> tuple[Null, bytes]:
-        string = string.lstrip()
+    def _build(cls, buf: bytes, match: re.Match) -> tuple[Null, int]:
+        return _NULL, match.end()
 
-        if string.lower().startswith(b"null"):
-            return cls(), string[4:]
-        else:
-            raise ParseError(f"Could not parse null from {string!r}.")
+
+# parsed values share these instances, as they hold no state or only one of two values
+_NULL = Null()
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True, frozen=True)
 class Boolean(_NoChildrenMixin, CosValue):
     value: bool
 
+    _PATTERN: typing.ClassVar[bytes] = rb"(?P<true>(?i:true))|(?P<false>(?i:false))"
+    _MATCH: typing.ClassVar = _compile_match(_PATTERN)
+
     @classmethod
-    def from_bytes(cls, string: bytes) -> tuple[Boolean, bytes]:
-        string = string.lstrip().lower()
+    def _build(cls, buf: bytes, match: re.Match) -> tuple[Boolean, int]:
+        return _TRUE if match.lastgroup == "true" else _FALSE, match.end()
 
-        if string.startswith(b"true"):
-            return cls(True), string[4:]
-        elif string.startswith(b"false"):
-            return cls(False), string[5:]
-        else:
-            raise ParseError(f"Could not parse boolean from {string!r}.")
+
+_TRUE = Boolean(True)
+_FALSE = Boolean(False)
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class String(_NoChildrenMixin, CosValue):
     value: bytes
     encoding: str | None
 
-    _OCTAL_ESCAPE: typing.ClassVar[re.Pattern] = re.compile(r"\\\d\d\d")
+    _PATTERN: typing.ClassVar[bytes] = rb"(?P<string>\()|(?P<hex_string><(?!<))"
+    _MATCH: typing.ClassVar = _compile_match(_PATTERN)
+    # the bytes that can end a literal string, nested parentheses have to be balanced unless they are escaped
+    _SPECIAL_SEARCH: typing.ClassVar = re.compile(rb"[()\\]").search
 
     def get_str(self, encoding: str | None = None) -> str:
         assert self.encoding is not None is not encoding
@@ -89,7 +213,7 @@ class String(_NoChildrenMixin, CosValue):
             raise TypeError(f"String must be str or bytes, not {type(string)}.")
 
     @classmethod
-    def from_bytes(cls, string: bytes) -> tuple[String, bytes]:
+    def _build(cls, buf: bytes, match: re.Match) -> tuple[String, int]:
         """
         Examples:
             (Testing)                   % ASCII
@@ -99,51 +223,78 @@ class String(_NoChildrenMixin, CosValue):
             (D:19990209153925-08'00')   % Date
             <1C2D3F>                    % Arbitrary binary data
         """
-        string = string.strip()
-        if string.startswith(b"("):
+        pos = match.end()
+        if match.lastgroup == "string":
             # TODO: handle PDFDocEncoding, etc...
+            end_i = buf.find(b")", pos)
+            if end_i == -1:
+                raise ParseError(f"Could not parse String from {buf[pos - 1:]!r}.")
+
+            if buf.find(b"(", pos, end_i) == -1 and buf.find(b"\\", pos, end_i) == -1:
+                # no nesting and nothing to unescape, which is the case for most strings
+                return cls(buf[pos:end_i], "utf-8"), end_i + 1
+
+            depth = 1
+            i = pos
+            while True:
+                special = cls._SPECIAL_SEARCH(buf, i)
+                if special is None:
+                    raise ParseError(f"Could not parse String from {buf[pos - 1:]!r}.")
+
+                end_i = special.start()
+                char = buf[end_i]
+                if char == 0x5C:
+                    # skip the escaped byte
+                    i = end_i + 2
+                    continue
+                elif char == 0x28:
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        break
+                i = end_i + 1
+
+            string = _unescape_literal(buf[pos:end_i])
+
+            return cls(string, "utf-8"), end_i + 1
+
+        else:
+            end_i = buf.find(b">", pos)
+            if end_i == -1:
+                raise ParseError(f"Could not parse String from {buf[pos - 1:]!r}.")
+
+            # fromhex skips ascii whitespace itself, so the common case decodes straight from a view
             try:
-                end_i = string.index(b")")
+                return cls(bytes.fromhex(str(memoryview(buf)[pos:end_i], "ascii")), encoding=None), end_i + 1
             except ValueError:
                 pass
-            else:
-                string, remainder = string[1:end_i].decode("utf-8"), string[end_i + 1:]
 
-                string = re.sub(cls._OCTAL_ESCAPE, lambda match: chr(int(match.group()[1:], 8)), string)
+            string = buf[pos:end_i].translate(None, delete=_WHITESPACE)
 
-                return cls.from_str(string), remainder
+            # a missing final digit is assumed to be 0
+            if len(string) % 2:
+                string += b"0"
 
-        elif string.startswith(b"<"):
             try:
-                end_i = string.index(b">") + 1
+                return cls(bytes.fromhex(string.decode("ascii")), encoding=None), end_i + 1
             except ValueError as e:
-                raise ParseError(f"Could not parse String from {string!r}.") from e
-            else:
-                string, remainder = string[:end_i], string[end_i:]
-                string = string[1:-1].decode("utf-8").replace(" ", "")
-
-                hex_nums_as_string = [elem for elem in zip(string[::2], string[1::2])]
-                try:
-                    return cls(
-                        b''.join([bytes((int(''.join(elem), 16),)) for elem in hex_nums_as_string]),
-                        encoding=None
-                    ), remainder
-                except ValueError as e:
-                    raise ParseError("String contains invalid hex literal.") from e
-
-        else:
-            raise ParseError(f"Could not parse String from {string!r}. "
-                             f"Must be enclosed with either parentheses or angle brackets.")
+                raise ParseError("String contains invalid hex literal.") from e
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True, frozen=True)
 class Number(_NoChildrenMixin, CosValue):
     value: float | int
 
-    _REGEX: typing.ClassVar[re.Pattern] = re.compile(rb"([+-]?(?:\d+(?:\.\d+)?)|(?:\.\d+))")
+    # reals have to come first, the integer alternative would match the digits before their decimal point
+    _PATTERN: typing.ClassVar[bytes] = rb"(?P<real>[+-]?(?:\d+\.\d*|\.\d+))|(?P<signed_integer>[+-]?\d+)"
+    _MATCH: typing.ClassVar = _compile_match(_PATTERN)
+    # parsed values by their textual representation, only short (and therefore frequent) ones are cached
+    _CACHE: typing.ClassVar[dict[bytes, Number]] = {}
+    _CACHE_MAX_LENGTH: typing.ClassVar[int] = 4
 
     @classmethod
-    def from_bytes(cls, string: bytes) -> tuple[Number, bytes]:
+    def _build(cls, buf: bytes, match: re.Match) -> tuple[Number, int]:
         """
         Examples:
             1
@@ -156,31 +307,38 @@ class Number(_NoChildrenMixin, CosValue):
             -3.14159
             300.9001
         """
+        # also called for the "integer" group of Reference._PATTERN
+        string = match.group(match.lastgroup)
 
-        match = cls._REGEX.match(string)
-        if match is None:
-            raise ParseError(f"Could not parse Number from {string!r}.")
-        else:
-            try:
-                return cls(int(match.group())), string[match.end():]
-            except ValueError:
-                try:
-                    return cls(float(match.group())), string[match.end():]
-                except ValueError as e:
-                    raise ParseError(f"Could not parse Number from {string!r}.") from e
+        number = cls._CACHE.get(string)
+        if number is not None:
+            return number, match.end()
 
+        number = cls(float(string) if match.lastgroup == "real" else int(string))
 
-_WHITESPACE = b"\x00\x09\x0A\x0C\x0D\x20"
+        if len(string) <= cls._CACHE_MAX_LENGTH:
+            cls._CACHE[string] = number
 
+        return number, match.end()
 
-@dataclasses.dataclass
+
+@dataclasses.dataclass(slots=True, frozen=True)
 class Name(_NoChildrenMixin, CosValue):
     label: str
 
-    _NONREGULAR_CHARACTERS: typing.ClassVar[re.Pattern] = re.compile("#[0-9A-Fa-f]{2}")
+    # #xx with xx being the hexadecimal character code
+    _HEX_ESCAPES: typing.ClassVar[dict[bytes, bytes]] = {
+        bytes((a, b)): bytes((int(bytes((a, b)), 16),)) for a in _HEX_DIGITS for b in _HEX_DIGITS
+    }
+    # a slash followed by regular characters
+    _PATTERN: typing.ClassVar[bytes] = rb"(?P<name>/" + _REGULAR_CLASS + rb"*)"
+    _MATCH: typing.ClassVar = _compile_match(_PATTERN)
+    # parsed names by their escaped label, a document only uses a limited set of names repeatedly
+    _CACHE: typing.ClassVar[dict[bytes, Name]] = {}
+    _CACHE_MAX_SIZE: typing.ClassVar[int] = 4096
 
     @classmethod
-    def from_bytes(cls, string: bytes) -> tuple[Name, bytes]:
+    def _build(cls, buf: bytes, match: re.Match) -> tuple[Name, int]:
         """
         Examples:
             /Type
@@ -188,125 +346,85 @@ class Name(_NoChildrenMixin, CosValue):
             /Lime#20Green
             /SSCN_SomeSecondClassName
         """
-        string = string.lstrip()
-
-        if not string.startswith(b"/"):
-            raise ParseError(f"Invalid Name {string!r}. Must start with a slash/SOLIDUS (\"/\").")
-
-        # remove slash
-        string = string[1:]
+        # skip slash
+        start, end = match.start("name") + 1, match.end()
+        string = buf[start:end]
 
-        for i, char in enumerate(string):
-            if not (0x21 < char < 0x7E) or bytes((char,)) in _WHITESPACE + b"/%[]<>{}()":
-                # name ends here
-                string, remainder = string[:i], string[i:]
-                break
-        else:
-            # name ends at the end of the string
-            string, remainder = string, b""
-
-        string = string.decode("utf-8")
+        name = cls._CACHE.get(string)
+        if name is None:
+            # interned, so the labels of names beyond the cache and the dictionary keys made from them are shared
+            name = cls(sys.intern(_unescape(string, b"#", cls._HEX_ESCAPES, 2).decode("latin-1")))
 
-        try:
-            string = re.sub(cls._NONREGULAR_CHARACTERS, lambda match: chr(int(match.group()[1:], 16)), string)
-        except ValueError as e:
-            raise ParseError("Name contains invalid hex literal.") from e
+            if len(cls._CACHE) < cls._CACHE_MAX_SIZE:
+                cls._CACHE[string] = name
 
-        return cls(string), remainder
+        return name, end
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Array(CosValue):
     elements: list[CosValue]
 
-    @classmethod
-    def from_bytes(cls, string: bytes) -> tuple[Array, bytes]:
-        string = string.lstrip()
+    _PATTERN: typing.ClassVar[bytes] = rb"(?P<array>\[)"
+    _MATCH: typing.ClassVar = _compile_match(_PATTERN)
 
-        if not string.startswith(b"["):
-            raise ParseError("Array must be delimited by square brackets.")
-
-        string = string[1:]
-
-        elements: list[CosValue] = []
-
-        while True:
-            string = string.lstrip()
-            try:
-                element, string = parse_cos_value(string)
-            except ParseError as e:
-                if string.startswith(b"]"):
-                    string = string[1:]
-                    break
-                else:
-                    raise ParseError(f"Could not parse Array from {string!r}.") from e
-            else:
-                elements.append(element)
-
-        return cls(elements), string
+    @classmethod
+    def _build(cls, buf: bytes, match: re.Match) -> tuple[Array, int]:
+        elements = []
+        return _parse(buf, match.end(), [("array", elements, elements.append)])
 
     @property
     def children(self) -> typing.Iterable[CosValue]:
         return self.elements
 
-    def replace_references(self, references: dict[tuple[int, int], CosValue]) -> None:
+    def replace_references(self, references: dict[tuple[int, int], CosValue], visited: set[int] | None = None) -> None:
+        if visited is None:
+            visited = set()
+        elif id(self) in visited:
+            return
+        visited.add(id(self))
+
         for i, element in enumerate(self.elements):
-            if isinstance(element, Reference):
+            if type(element) is Reference:
                 try:
                     self.elements[i] = references[(element.obj_num, element.gen_num)]
                 except KeyError as e:
                     raise ParseError(f"Reference {element!r} does not exist.") from e
-            else:
-                element.replace_references(references)
+            elif element._holds_references:
+                element.replace_references(references, visited)
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Dictionary(CosValue):
     value: dict[str, CosValue]
 
-    @classmethod
-    def from_bytes(cls, string: bytes) -> tuple[Dictionary, bytes]:
-        string = string.lstrip()
-
-        if not string.startswith(b"<<"):
-            raise ParseError("Dictionary must be delimited by double angle brackets.")
-
-        string = string[2:]
-
-        value: dict = {}
-
-        while True:
-            string = string.lstrip()
-            try:
-                key, string = Name.from_bytes(string)
-            except ParseError as e:
-                if string.startswith(b">>"):
-                    string = string[2:]
-                    break
-                else:
-                    raise ParseError(f"Could not parse Dictionary from {string!r}.") from e
-            else:
-                string = string.lstrip()
-                try:
-                    value[key.label], string = parse_cos_value(string)
-                except ParseError as e:
-                    raise ParseError(f"Could not parse Dictionary from {string!r}.") from e
+    _PATTERN: typing.ClassVar[bytes] = rb"(?P<dictionary><<)"
+    _MATCH: typing.ClassVar = _compile_match(_PATTERN)
 
-        return cls(value), string
+    @classmethod
+    def _build(cls, buf: bytes, match: re.Match) -> tuple[Dictionary, int]:
+        items = []
+        return _parse(buf, match.end(), [("dictionary", items, items.append)])
 
     @property
     def children(self) -> typing.Iterable[CosValue]:
         return self.value.values()
 
-    def replace_references(self, references: dict[tuple[int, int], CosValue]) -> None:
+    def replace_references(self, references: dict[tuple[int, int], CosValue], visited: set[int] | None = None) -> None:
+        if visited is None:
+            visited = set()
+        elif id(self) in visited:
+            return
+        visited.add(id(self))
+
         for key, element in self.value.items():
-            if isinstance(element, Reference):
+            if type(element) is Reference:
                 try:
                     self.value[key] = references[(element.obj_num, element.gen_num)]
                 except KeyError as e:
                     raise ParseError(f"Reference {element!r} does not exist.") from e
-            else:
-                element.replace_references(references)
+            elif element._holds_references:
+                element.replace_references(references, visited)
 
     def __getitem__(self, item):
         return self.value[item]
@@ -315,73 +433,183 @@ class Dictionary(CosValue):
         return item in self.value
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Stream(CosValue):
     stream_dict: Dictionary
     value: bytes
+    # the data with the filters applied, only computed once decode() is called
+    _decoded: bytes | None = dataclasses.field(default=None, init=False, repr=False, compare=False)
+
+    # upper bound of the decoded to encoded length ratio trusted from /DL
+    _MAX_DL_RATIO: typing.ClassVar[int] = 64
+    # the end of line before endstream is not part of the data
+    _ENDSTREAM_MATCH: typing.ClassVar = re.compile(rb"(?:\r\n|\r|\n)?endstream").match
 
     @classmethod
-    def from_bytes(cls, string: bytes) -> tuple[Stream, bytes]:
-        dictionary, string = Dictionary.from_bytes(string)
+    def parse(cls, buf: bytes, pos: int) -> tuple[Stream, int]:
+        dictionary, pos = Dictionary.parse(buf, pos)
 
-        string = string.lstrip()
+        return cls.from_dictionary(dictionary, buf, pos)
 
-        if not string.startswith(b"stream\n"):
+    @classmethod
+    def from_dictionary(cls, dictionary: Dictionary, buf: bytes, pos: int) -> tuple[Stream, int]:
+        """Parse the stream body following an already parsed stream dictionary."""
+        pos = _WS_END(buf, pos).end()
+
+        if buf.startswith(b"stream\n", pos):
+            pos += 7
+        elif buf.startswith(b"stream\r\n", pos):
+            pos += 8
+        else:
             raise ParseError("Stream must be delimited by the stream keyword.")
 
-        string = string[7:]
+        # a direct length allows skipping the data, it is only trusted if endstream follows right after it
+        length = dictionary.value.get("Length")
+        if type(length) is Number and type(length.value) is int and length.value >= 0:
+            match = cls._ENDSTREAM_MATCH(buf, pos + length.value)
+            if match is not None:
+                return cls(dictionary, buf[pos:pos + length.value]), match.end()
 
-        try:
-            out_bytes, remainder = string.split(b"\nendstream", 1)
-        except ValueError as e:
-            raise ParseError("Stream must be delimited by the endstream keyword.") from e
+        end = buf.find(b"\nendstream", pos)
+        if end == -1:
+            raise ParseError("Stream must be delimited by the endstream keyword.")
 
-        return cls(dictionary, out_bytes), remainder
+        return cls(dictionary, buf[pos:end]), end + 10
 
     @property
     def children(self) -> typing.Iterable[CosValue]:
         return self.stream_dict.children
 
-    def replace_references(self, references: dict[tuple[int, int], CosValue]) -> None:
-        self.stream_dict.replace_references(references)
+    def replace_references(self, references: dict[tuple[int, int], CosValue], visited: set[int] | None = None) -> None:
+        self.stream_dict.replace_references(references, visited)
 
     def decode(self) -> bytes:
+        if self._decoded is None:
+            self._decoded = self._apply_filters()
+
+        return self._decoded
+
+    def _apply_filters(self) -> bytes:
         if "Filter" in self.stream_dict:
             if self.stream_dict["Filter"].label == "FlateDecode":
-                import zlib
-                return zlib.decompress(self.value)
+                # the optional decoded length lets zlib allocate the output buffer once, as it comes from the
+                # file it is only a hint and capped to what the data can plausibly decompress to
+                decoded_length = self.stream_dict.value.get("DL")
+                if type(decoded_length) is Number and type(decoded_length.value) is int:
+                    bufsize = min(decoded_length.value, len(self.value) * self._MAX_DL_RATIO)
+                    return zlib.decompress(self.value, bufsize=max(bufsize, 1))
+                else:
+                    return zlib.decompress(self.value)
             else:
-                raise NotImplementedError(f"Filter {self.stream_dict['Filter'].value!r} not implemented.")
+                raise NotImplementedError(f"Filter {self.stream_dict['Filter'].label!r} not implemented.")
         else:
             return self.value
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Reference(_NoChildrenMixin, CosValue):
     obj_num: int
     gen_num: int
 
-    _REGEX: typing.ClassVar[re.Pattern] = re.compile(rb"(\d+)\s+(\d+)\s+R")
+    _holds_references: typing.ClassVar[bool] = True
+
+    # an unsigned integer, optionally followed by the rest of a reference, so that in _LEXER the digits of a
+    # number are only scanned once, lastgroup is "reference" for references and "integer" for plain integers
+    _PATTERN: typing.ClassVar[bytes] = (
+        rb"(?P<integer>\d+)(?:(?P<reference>" + _WS_CLASS + rb"+(?P<gen_num>\d+)" + _WS_CLASS + rb"+R)|(?![.\d]))"
+    )
+    _MATCH: typing.ClassVar = _compile_match(_PATTERN)
 
     @classmethod
-    def from_bytes(cls, string: bytes) -> tuple[Reference, bytes]:
-        string = string.lstrip()
+    def parse(cls, buf: bytes, pos: int) -> tuple[Reference, int]:
+        match = cls._MATCH(buf, pos)
+        if match is None or match.lastgroup != "reference":
+            raise ParseError(f"Could not parse Reference from {buf[pos:]!r}.")
 
-        match = cls._REGEX.match(string)
+        return cls._build(buf, match)
+
+    @classmethod
+    def _build(cls, buf: bytes, match: re.Match) -> tuple[Reference, int]:
+        return cls(int(match.group("integer")), int(match.group("gen_num"))), match.end()
+
+
+# matches the start of any COS value or the end of a container,
+# Reference has to come before Number as it also matches unsigned integers
+_LEXER = re.compile(_WS + b"(?:" + b"|".join((
+    *(cos_type._PATTERN for cos_type in (Reference, Number, Name, Boolean, Null, Dictionary, String, Array)),
+    rb"(?P<dictionary_end>>>)",
+    rb"(?P<array_end>\])",
+)) + b")").match
+
+# builders of the values without nested values by the name of the group that matched in _LEXER
+_BUILDERS: dict[str, typing.Callable[[bytes, re.Match], tuple[CosValue, int]]] = {
+    "reference": Reference._build,
+    "integer": Number._build,
+    "signed_integer": Number._build,
+    "real": Number._build,
+    "name": Name._build,
+    "true": Boolean._build,
+    "false": Boolean._build,
+    "null": Null._build,
+    "string": String._build,
+    "hex_string": String._build,
+}
+
+
+def _parse(buf: bytes, pos: int, stack: list[tuple[str, list, typing.Callable]]) -> tuple[CosValue, int]:
+    """Parse a COS value from buf at pos, keeping the open arrays and dictionaries on an explicit stack.
+
+    Each stack entry holds the kind of container ("array", "dictionary" or "dictionary_or_stream" for a
+    dictionary that may be the start of a stream), the values parsed so far, for dictionaries alternating
+    between key and value, and their bound append method. Parsing stops once a value is complete and nothing
+    is left on the stack.
+    """
+    while True:
+        match = _LEXER(buf, pos)
         if match is None:
-            raise ParseError(f"Invalid Reference {string!r}.")
+            raise ParseError(f"Could not parse COS value from {buf[pos:]!r}.")
+
+        kind = match.lastgroup
+        pos = match.end()
+
+        if kind == "array":
+            items = []
+            stack.append(("array", items, items.append))
+            continue
+        elif kind == "dictionary":
+            items = []
+            stack.append(("dictionary_or_stream", items, items.append))
+            continue
+        elif kind == "array_end":
+            if not stack or stack[-1][0] != "array":
+                raise ParseError(f"Unexpected end of Array at {buf[match.start(kind):]!r}.")
+
+            value = Array(stack.pop()[1])
+        elif kind == "dictionary_end":
+            if not stack or stack[-1][0] == "array":
+                raise ParseError(f"Unexpected end of Dictionary at {buf[match.start(kind):]!r}.")
+
+            container_kind, items, _ = stack.pop()
+            if len(items) % 2:
+                raise ParseError(f"Dictionary key {items[-1]!r} has no value.")
+
+            value = Dictionary({key.label: item for key, item in zip(items[::2], items[1::2])})
+
+            if container_kind == "dictionary_or_stream" and buf.startswith(b"stream", _WS_END(buf, pos).end()):
+                value, pos = Stream.from_dictionary(value, buf, pos)
         else:
-            obj_num, gen_num = match.groups()
-            return cls(int(obj_num), int(gen_num)), string[match.end():]
+            value, pos = _BUILDERS[kind](buf, match)
 
+        if not stack:
+            return value, pos
 
-def parse_cos_value(string: bytes) -> tuple[CosValue, bytes]:
-    types = Reference, Stream, Dictionary, String, Name, Array, Null, Boolean, Number
+        container_kind, items, append = stack[-1]
+        if container_kind != "array" and not len(items) % 2 and type(value) is not Name:
+            raise ParseError(f"Dictionary key must be a Name, not {value!r}.")
 
-    for cos_type in types:
-        try:
-            return cos_type.from_bytes(string)
-        except ParseError:
-            pass
+        append(value)
 
-    raise ParseError
+
+def parse_cos_value(string: bytes) -> tuple[CosValue, bytes]:
+    value, pos = _parse(string, 0, [])
+    return value, string[pos:]
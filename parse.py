@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import dataclasses
+import mmap
+import os
 from pprint import pprint
 
 import cos
@@ -16,19 +18,26 @@ class Object:
     gen_num: int
     content: bytes
     parsed_content: cos.CosValue = dataclasses.field(init=False)
+    # values already parsed by content, so identical object bodies are only parsed once
+    cache: dataclasses.InitVar[dict[bytes, cos.CosValue] | None] = None
 
-    def __post_init__(self):
-        self.parsed_content = cos.parse_cos_value(self.content)[0]
+    def __post_init__(self, cache: dict[bytes, cos.CosValue] | None):
+        if cache is None:
+            self.parsed_content = cos.parse_cos_value(self.content)[0]
+        elif self.content in cache:
+            self.parsed_content = cache[self.content]
+        else:
+            self.parsed_content = cache[self.content] = cos.parse_cos_value(self.content)[0]
 
     @classmethod
-    def from_bytes(cls, byte_string: bytes) -> Object:
+    def from_bytes(cls, byte_string: bytes, cache: dict[bytes, cos.CosValue] | None = None) -> Object:
         lines = byte_string.split(b"\n")
         if not lines[0].endswith(b" obj"):
             raise ParseError("Invalid object: first line does not end with ' obj'")
         if not lines[-1] == b"endobj":
             raise ParseError("Invalid object: does not end with 'endobj'")
         obj_id, generation = lines[0].split(b" ")[:2]
-        return cls(int(obj_id), int(generation), b"\n".join(lines[1:-1]))
+        return cls(int(obj_id), int(generation), b"\n".join(lines[1:-1]), cache)
 
 
 @dataclasses.dataclass
@@ -42,7 +51,8 @@ class Header:
 
     def extract_version(self) -> str:
         """Extracts the PDF version from the header."""
-        return self.content.decode("utf-8").split("\n")[0].split("-")[-1]
+        # only the first line is text; the usual binary comment after it need not be valid utf-8
+        return self.content.split(b"\n", 1)[0].split(b"-")[-1].decode("ascii")
 
 
 @dataclasses.dataclass
@@ -62,16 +72,20 @@ class Body:
         object_ends = [i for i, line in enumerate(lines) if line == b"endobj"]
         if len(object_starts) != len(object_ends):
             raise ParseError("Invalid body: number of object starts and ends do not match.")
+        # only shared within one body, as the values are resolved against this body's objects
+        parsed: dict[bytes, cos.CosValue] = {}
         for start, end in zip(object_starts, object_ends):
-            cur_object = Object.from_bytes(b"\n".join(lines[start:end + 1]))
+            cur_object = Object.from_bytes(b"\n".join(lines[start:end + 1]), parsed)
             self.objects[cur_object.obj_num, cur_object.gen_num] = cur_object
 
     def resolve_references(self):
         lookup = {(obj.obj_num, obj.gen_num): obj.parsed_content for obj in self.objects.values()}
+        # shared across the objects, so every container is walked once, even if it is reachable from other objects
+        visited: set[int] = set()
 
         for obj in self.objects.values():
             if isinstance(obj.parsed_content, cos.CosValue):
-                obj.parsed_content.replace_references(lookup)
+                obj.parsed_content.replace_references(lookup, visited)
             else:
                 raise ParseError(f"Invalid object: {obj.parsed_content!r} is not a CosValue.")
 
@@ -90,42 +104,43 @@ class Trailer:
         if not self.content.startswith(b"trailer\n"):
             raise ParseError("Invalid trailer: does not start with b'trailer\\n'.")
 
-        _, trailer_data_start = self.content.split(b"\n", 1)
-
-        self.parsed_content = cos.parse_cos_value(trailer_data_start)[0]
+        self.parsed_content = cos.Dictionary.parse(self.content, len(b"trailer\n"))[0]
 
 
 @dataclasses.dataclass
 class PdfSplitter:
-    string: bytes
-    lines: list[bytes] = dataclasses.field(init=False)
-
-    def __post_init__(self):
-        self.lines = self.string.split(b"\n")
+    string: bytes | mmap.mmap
+
+    def find_line(self, marker: bytes, starts_line: bool = True, ends_line: bool = True) -> int:
+        """Returns the offset of the first line containing marker at its start and/or end, -1 if there is none."""
+        pos = self.string.find(marker)
+        while pos != -1:
+            end = pos + len(marker)
+            if ((not starts_line or pos == 0 or self.string[pos - 1] == 0x0A)
+                    and (not ends_line or end == len(self.string) or self.string[end] == 0x0A)):
+                return self.string.rfind(b"\n", 0, pos) + 1
+            pos = self.string.find(marker, pos + 1)
+        return -1
 
     def find_header_start(self) -> int:
-        for i, line in enumerate(self.lines):
-            if line.startswith(b"%PDF-"):
-                return i
-        raise ParseError("Could not find start of header.")
+        if (offset := self.find_line(b"%PDF-", ends_line=False)) == -1:
+            raise ParseError("Could not find start of header.")
+        return offset
 
     def find_first_object(self) -> int:
-        for i, line in enumerate(self.lines):
-            if line.endswith(b" obj"):
-                return i
-        raise ParseError("Could not find start of body.")
+        if (offset := self.find_line(b" obj", starts_line=False)) == -1:
+            raise ParseError("Could not find start of body.")
+        return offset
 
     def find_cross_reference_table(self) -> int:
-        for i, line in enumerate(self.lines):
-            if line == b"xref":
-                return i
-        raise ParseError("Could not find start of cross reference table.")
+        if (offset := self.find_line(b"xref")) == -1:
+            raise ParseError("Could not find start of cross reference table.")
+        return offset
 
     def find_trailer(self) -> int:
-        for i, line in enumerate(self.lines):
-            if line == b"trailer":
-                return i
-        raise ParseError("Could not find start of trailer.")
+        if (offset := self.find_line(b"trailer")) == -1:
+            raise ParseError("Could not find start of trailer.")
+        return offset
 
 
 @dataclasses.dataclass
@@ -149,21 +164,27 @@ class PdfFile:
     @classmethod
     def from_file(cls, filepath: str) -> PdfFile:
         with open(filepath, "rb") as f:
-            return cls.from_bytes(f.read())
+            # empty files cannot be mapped, they fail the regular way when looking for the header
+            if os.fstat(f.fileno()).st_size == 0:
+                return cls.from_bytes(b"")
+
+            # slicing the map copies out the sections, so nothing refers to it once it is closed
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                return cls.from_bytes(buf)
 
     @classmethod
-    def from_bytes(cls, byte_string: bytes) -> PdfFile:
-        lines = byte_string.split(b"\n")
+    def from_bytes(cls, byte_string: bytes | mmap.mmap) -> PdfFile:
         pdf_splitter = PdfSplitter(byte_string)
         header_start = pdf_splitter.find_header_start()
         body_start = pdf_splitter.find_first_object()
         cross_reference_table_start = pdf_splitter.find_cross_reference_table()
         trailer_start = pdf_splitter.find_trailer()
+        # the sections are sliced by offset, without the newline that separates them
         return cls(
-            Header(b"\n".join(lines[header_start:body_start])),
-            Body(b"\n".join(lines[body_start:cross_reference_table_start])),
-            CrossReferenceTable(b"\n".join(lines[cross_reference_table_start:trailer_start])),
-            Trailer(b"\n".join(lines[trailer_start:])),
+            Header(byte_string[header_start:body_start - 1]),
+            Body(byte_string[body_start:cross_reference_table_start - 1]),
+            CrossReferenceTable(byte_string[cross_reference_table_start:trailer_start - 1]),
+            Trailer(byte_string[trailer_start:]),
         )
 
 
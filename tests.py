@@ -1,4 +1,10 @@
+import dataclasses
+import os
+import tempfile
 import unittest
+import zlib
+
+import parse
 from cos import *
 
 
@@ -16,6 +22,13 @@ class TestBoolean(unittest.TestCase):
         self.assertEqual(parse_cos_value(b"faLSE"), (Boolean(False), b""))
         self.assertEqual(parse_cos_value(b"true asd"), (Boolean(True), b" asd"))
         self.assertEqual(parse_cos_value(b"false asd"), (Boolean(False), b" asd"))
+        self.assertEqual(parse_cos_value(b"TRUE Asd"), (Boolean(True), b" Asd"))
+
+    def test_shared_values_are_immutable(self):
+        # parsed booleans are shared, so changing one would change all later ones
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            parse_cos_value(b"[true]")[0].elements[0].value = False
+        self.assertEqual(parse_cos_value(b"true"), (Boolean(True), b""))
 
 
 class TestString(unittest.TestCase):
@@ -27,6 +40,15 @@ class TestString(unittest.TestCase):
     def test_escape(self):
         self.assertEqual(parse_cos_value(rb"(hello\053world)"), (String.from_str("hello+world"), b""))
         self.assertEqual(parse_cos_value(rb"(A\053B)"), (String.from_str("A+B"), b""))
+        self.assertEqual(parse_cos_value(rb"(a\53b\0)"), (String.from_str("a+b\0"), b""))
+        self.assertEqual(parse_cos_value(rb"(line\nbreak\\)"), (String.from_str("line\nbreak\\"), b""))
+        self.assertEqual(parse_cos_value(b"(split \\\nline)"), (String.from_str("split line"), b""))
+
+    def test_parentheses(self):
+        self.assertEqual(parse_cos_value(rb"(a (nested) string) asd"), (String.from_str("a (nested) string"), b" asd"))
+        self.assertEqual(parse_cos_value(rb"(an \) escaped one)"), (String.from_str("an ) escaped one"), b""))
+        with self.assertRaises(ParseError):
+            parse_cos_value(rb"(unbalanced (string)")
 
     def test_pdf_doc_encoding(self):
         # TODO
@@ -35,6 +57,14 @@ class TestString(unittest.TestCase):
     def test_binary(self):
         self.assertEqual(parse_cos_value(rb"<1C2D3F>"), (String.from_str(b"\x1c\x2d\x3f"), b""))
         self.assertEqual(parse_cos_value(rb"<3A5C7E>"), (String.from_str(b"\x3a\x5c\x7e"), b""))
+        # a missing final digit is 0
+        self.assertEqual(parse_cos_value(rb"<a>"), (String.from_str(b"\xa0"), b""))
+        self.assertEqual(parse_cos_value(rb"<1C2D3>"), (String.from_str(b"\x1c\x2d\x30"), b""))
+        # whitespace, including NUL, is ignored
+        self.assertEqual(parse_cos_value(rb"<1 C2D>"), (String.from_str(b"\x1c\x2d"), b""))
+        self.assertEqual(parse_cos_value(b"<41\x0042>"), (String.from_str(b"AB"), b""))
+        with self.assertRaises(ParseError):
+            parse_cos_value(rb"<1G>")
 
     # def test_binary_bom(self):
     #     # bom = byte order mark
@@ -60,6 +90,14 @@ class TestNumber(unittest.TestCase):
         self.assertEqual(parse_cos_value(b".25"), (Number(0.25), b""))
         self.assertEqual(parse_cos_value(b"-3.14159"), (Number(-3.14159), b""))
         self.assertEqual(parse_cos_value(b"+300.9001"), (Number(300.9001), b""))
+        self.assertEqual(parse_cos_value(b"1."), (Number(1.0), b""))
+        self.assertEqual(parse_cos_value(b"-.5 asd"), (Number(-0.5), b" asd"))
+
+    def test_shared_values_are_immutable(self):
+        # short numbers are cached, so changing one would change all later ones
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            parse_cos_value(b"[1]")[0].elements[0].value = 99
+        self.assertEqual(parse_cos_value(b"1"), (Number(1), b""))
 
 
 class TestName(unittest.TestCase):
@@ -71,6 +109,12 @@ class TestName(unittest.TestCase):
         self.assertEqual(parse_cos_value(b"/Name#20asd"), (Name("Name asd"), b""))
         self.assertEqual(parse_cos_value(b"/Name#2F"), (Name("Name/"), b""))
         self.assertEqual(parse_cos_value(b"/Name#2Fasd"), (Name("Name/asd"), b""))
+        self.assertEqual(parse_cos_value(b"/a!b~c"), (Name("a!b~c"), b""))
+
+    def test_shared_values_are_immutable(self):
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            parse_cos_value(b"[/Name]")[0].elements[0].label = "Other"
+        self.assertEqual(parse_cos_value(b"/Name"), (Name("Name"), b""))
 
 
 class TestArray(unittest.TestCase):
@@ -98,6 +142,14 @@ class TestReference(unittest.TestCase):
 
 
 class TestDictionary(unittest.TestCase):
+    def test_invalid_dictionary(self):
+        with self.assertRaises(ParseError):
+            parse_cos_value(b"<<1 /Name>>")
+        with self.assertRaises(ParseError):
+            parse_cos_value(b"<</Name>>")
+        with self.assertRaises(ParseError):
+            parse_cos_value(b"<</Name /Name]")
+
     def test_dictionary(self):
         self.assertEqual(parse_cos_value(b"<<>>"), (Dictionary({}), b""))
         self.assertEqual(parse_cos_value(b"<<>> asd"), (Dictionary({}), b" asd"))
@@ -117,12 +169,195 @@ class TestDictionary(unittest.TestCase):
         )
 
 
+class TestFromBytes(unittest.TestCase):
+    def test_leading_whitespace(self):
+        # the whitespace has to be skipped before every alternative of a pattern
+        cases = [
+            (Null, b" null", Null()),
+            (Boolean, b" true", Boolean(True)),
+            (Boolean, b" false", Boolean(False)),
+            (String, b" (a)", String.from_str("a")),
+            (String, b" <41>", String.from_str(b"A")),
+            (Number, b" 12", Number(12)),
+            (Number, b" -1", Number(-1)),
+            (Number, b" 1.5", Number(1.5)),
+            (Name, b" /Name", Name("Name")),
+            (Array, b" [/Name]", Array([Name("Name")])),
+            (Dictionary, b" <</Name 1>>", Dictionary({"Name": Number(1)})),
+            (Reference, b" 1 0 R", Reference(1, 0)),
+            (Stream, b" <</Length 1>>\nstream\na\nendstream", Stream(Dictionary({"Length": Number(1)}), b"a")),
+        ]
+        for cos_type, string, value in cases:
+            with self.subTest(string=string):
+                self.assertEqual(cos_type.from_bytes(string + b" asd"), (value, b" asd"))
+
+
+class TestReplaceReferences(unittest.TestCase):
+    def test_replace_references(self):
+        value, _ = parse_cos_value(b"<</Kids [1 0 R 2] /Font <</F1 1 0 R>> /Parent 1 0 R>>")
+        value.replace_references({(1, 0): Name("Page")})
+        self.assertEqual(value, Dictionary({
+            "Kids": Array([Name("Page"), Number(2)]),
+            "Font": Dictionary({"F1": Name("Page")}),
+            "Parent": Name("Page"),
+        }))
+
+    def test_missing_reference(self):
+        value, _ = parse_cos_value(b"[1 0 R]")
+        with self.assertRaises(ParseError):
+            value.replace_references({})
+
+    def test_mutation_after_construction(self):
+        array = Array([])
+        array.elements.append(Reference(1, 0))
+        array.replace_references({(1, 0): Name("X")})
+        self.assertEqual(array, Array([Name("X")]))
+
+        dictionary = Dictionary({"A": Reference(1, 0), "B": Number(1)})
+        dictionary.value["C"] = Reference(1, 0)
+        del dictionary.value["A"]
+        dictionary.replace_references({(1, 0): Name("X")})
+        self.assertEqual(dictionary, Dictionary({"B": Number(1), "C": Name("X")}))
+
+        with self.assertRaises(ParseError):
+            dictionary.value["D"] = Reference(2, 0)
+            dictionary.replace_references({(1, 0): Name("X")})
+
+    def test_cyclic_references(self):
+        page, _ = parse_cos_value(b"<</Parent 1 0 R>>")
+        pages, _ = parse_cos_value(b"<</Kids [2 0 R]>>")
+        references = {(1, 0): pages, (2, 0): page}
+        page.replace_references(references)
+        pages.replace_references(references)
+        self.assertIs(page["Parent"]["Kids"].elements[0], page)
+
+        # walking resolved values again must not follow the cycle forever
+        page.replace_references(references)
+        pages.replace_references(references)
+
+
 class TestStream(unittest.TestCase):
     def test_stream(self):
         a = b'<</Length 265/Filter/FlateDecode>>\nstream\nx\xc2\x9c]\xc2\x90\xc3\x8dn\xc2\x84 \x14\xc2\x85\xc3\xb7<\x05\xc3\x8b\xc2\x99\xc3\x85\x04\xc5\xbd:\xc3\x8e$\xc3\x86\xe2\x82\xac\xc2\xb11q\xc3\x91\xc2\x9f\xc3\x94\xc3\xb6\x01\x10\xc2\xae\xc2\x96d\x04\xc2\x82\xc5\xbe\xc3\xb0\xc3\xad\xc3\x8b\xc3\x8f\xc5\xbdM\xc2\xba\xc2\x80|7\xc3\xb7\x1c\xc5\xbe\xc3\xa7\xc2\x92\xc2\xb6\x7f\xc3\xaa\xc2\x95t\xc3\xa4\xc3\x8dj>\xc2\x80\xc3\x83\xc2\x93T\xc3\x82\xc3\x82\xc2\xaa7\xc3\x8b\x01\xc2\x8f0K\xc2\x85\xc2\xb2\x1c\x0b\xc3\x89\xc3\x9d\xc5\x93\xc2\x8a7_\xc2\x98A\xc3\x84{\xc2\x87}u\xc2\xb0\xc3\xb4j\xc3\x92u\xc2\x8d\xc3\x88\xc2\xbb\xc3\xaf\xc2\xad\xc3\x8e\xc3\xae\xc3\xb8\xc3\xb0(\xc3\xb4\x08GD^\xc2\xad +\xc3\x95\xc2\x8c\x0f\xc2\x9f\xc3\xad\xc3\xa0\xc3\xaba3\xc3\xa6\x06\x0b(\xc2\x87)j\x1a,`\xc3\xb2\xc3\xaf<3\xc3\xb3\xc3\x82\x16 \xc3\x91u\xc3\xaa\xc2\x85oK\xc2\xb7\xc2\x9f\xc5\x92\xc3\xa5O\xc3\xb0\xc2\xb1\x1b\xc3\x80y\xc2\xac\xc2\xb34\n\xc3\x97\x02V\xc3\x838X\xc5\xa0f@5\xc2\xa5\n\xc2\xae\xc2\xbb\xc2\xaeA\xc2\xa0\xc3\x84\xc2\xbf\xc3\x9e59\xc3\x86\xc2\x89\x7f1\xc3\xab\xc2\x95\xc2\x99WRZ\\\x1a\xc3\x8fy\xc3\xa4s\x19\xc3\xb8!q\x1b\xc5\xbeH\xc3\x9c\x05.#\xc3\xa74\xc3\xb09rY\x05\xc2\xae"Wy\xc3\xa0K\xc3\x92\x17\xc2\x81\xc2\xafI\xc2\x9f\xc3\x85Y\xc3\xae\xc2\xbf\xc2\x86\xc2\xa9\xc3\x82\xc3\x9a~\xc3\x92b\xc5\xb8Y\xc3\xab\xc2\x93\xc3\x86\xc3\x9d\xc3\x86\xc2\x88!\xc2\x9cT\xc3\xb0\xc2\xbb~\xc2\xa3Mp\xc3\x85\xc3\xb3\n\xc5\xa1Q\xc2\x80\x07\nendstream'
 
         self.assertIsInstance(parse_cos_value(a)[0], Stream)
 
+    def test_decode(self):
+        data = zlib.compress(b"BT /F1 24 Tf ET")
+        stream = parse_cos_value(b"<</Length %d/Filter/FlateDecode>>\nstream\n%s\nendstream" % (len(data), data))[0]
+
+        # the data is only decompressed once it is asked for
+        self.assertEqual(stream.value, data)
+        self.assertEqual(stream.decode(), b"BT /F1 24 Tf ET")
+        self.assertIs(stream.decode(), stream.decode())
+
+    def test_decoded_length(self):
+        data = zlib.compress(b"BT /F1 24 Tf ET")
+        # /DL is only a hint, implausible or indirect values must not be trusted
+        for decoded_length in (b"15", b"0", b"-3", b"1099511627776", b"1 0 R"):
+            stream = parse_cos_value(
+                b"<</Length %d/Filter/FlateDecode/DL %s>>\nstream\n%s\nendstream" % (len(data), decoded_length, data)
+            )[0]
+            with self.subTest(decoded_length=decoded_length):
+                self.assertEqual(stream.decode(), b"BT /F1 24 Tf ET")
+
+    def test_length(self):
+        length = Dictionary({"Length": Number(13)})
+        self.assertEqual(
+            parse_cos_value(b"<</Length 13>>\nstream\nab\nendstream!\nendstream asd"),
+            (Stream(length, b"ab\nendstream!"), b" asd")
+        )
+        self.assertEqual(
+            parse_cos_value(b"<</Length 13>>\nstream\r\nab\nendstream!\r\nendstream"),
+            (Stream(length, b"ab\nendstream!"), b"")
+        )
+        # a wrong length falls back to searching for endstream
+        self.assertEqual(
+            parse_cos_value(b"<</Length 3>>\nstream\nabcd\nendstream"),
+            (Stream(Dictionary({"Length": Number(3)}), b"abcd"), b"")
+        )
+        # a negative length must not move back into the dictionary
+        self.assertEqual(
+            parse_cos_value(b"<</T/Xendstream/Length -30>>\nstream\nDATA\nendstream"),
+            (Stream(Dictionary({"T": Name("Xendstream"), "Length": Number(-30)}), b"DATA"), b"")
+        )
+
+
+class TestPdfFile(unittest.TestCase):
+    header = b"%PDF-1.7\n%\xe2\xe3\xcf\xd3"
+    body = (
+        b"1 0 obj\n<</Type /Catalog /Pages 2 0 R /Note (no xref here)>>\nendobj\n"
+        b"2 0 obj\n<</Type /Pages /Kids [3 0 R 4 0 R] /Count 2>>\nendobj\n"
+        b"3 0 obj\n<</Type /Page /Parent 2 0 R>>\nendobj\n"
+        b"4 0 obj\n<</Type /Page /Parent 2 0 R>>\nendobj"
+    )
+    cross_reference_table = b"xref\n0 5\n0000000000 65535 f "
+    trailer = b"trailer\n<</Size 5 /Root 1 0 R>>\nstartxref\n0\n%%EOF"
+    content = b"\n".join([header, body, cross_reference_table, trailer])
+
+    def test_splitter(self):
+        splitter = parse.PdfSplitter(self.content)
+        # the offsets are those of the lines the sections start with, "xref" inside a line does not count
+        self.assertEqual(splitter.find_header_start(), 0)
+        self.assertEqual(splitter.find_first_object(), self.content.index(b"1 0 obj"))
+        self.assertEqual(splitter.find_cross_reference_table(), self.content.index(b"\nxref\n") + 1)
+        self.assertEqual(splitter.find_trailer(), self.content.index(b"trailer"))
+
+        with self.assertRaises(parse.ParseError):
+            parse.PdfSplitter(self.body).find_trailer()
+
+    def test_sections(self):
+        pdf_file = parse.PdfFile.from_bytes(self.content)
+        self.assertEqual(pdf_file.header.content, self.header)
+        self.assertEqual(pdf_file.body.content, self.body)
+        self.assertEqual(pdf_file.cross_reference_table.content, self.cross_reference_table)
+        self.assertEqual(pdf_file.trailer.content, self.trailer)
+        self.assertEqual(pdf_file.content, self.content)
+
+    def test_binary_header_line(self):
+        self.assertEqual(parse.PdfFile.from_bytes(self.content).header.version, "1.7")
+
+    def test_objects(self):
+        objects = parse.PdfFile.from_bytes(self.content).body.objects
+        pages = objects[2, 0].parsed_content
+
+        # identical object bodies are only parsed once
+        self.assertIs(objects[3, 0].parsed_content, objects[4, 0].parsed_content)
+        self.assertIs(objects[1, 0].parsed_content["Pages"], pages)
+        self.assertIs(pages["Kids"].elements[0], objects[3, 0].parsed_content)
+        self.assertIs(objects[3, 0].parsed_content["Parent"], pages)
+
+    def test_empty_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "empty.pdf")
+            open(filepath, "wb").close()
+
+            with self.assertRaises(parse.ParseError):
+                parse.PdfFile.from_file(filepath)
+
+    def test_from_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "test.pdf")
+            with open(filepath, "wb") as f:
+                f.write(self.content)
+
+            pdf_file = parse.PdfFile.from_file(filepath)
+
+        # the sections are copied out of the map, so they are still valid once it is closed
+        for section, content in (
+            (pdf_file.header, self.header),
+            (pdf_file.body, self.body),
+            (pdf_file.cross_reference_table, self.cross_reference_table),
+            (pdf_file.trailer, self.trailer),
+        ):
+            self.assertIs(type(section.content), bytes)
+            self.assertEqual(section.content, content)
+
+        objects = pdf_file.body.objects
+        self.assertEqual(objects[3, 0].parsed_content["Type"], Name("Page"))
+        self.assertIs(objects[3, 0].parsed_content["Parent"], objects[2, 0].parsed_content)
+        self.assertEqual(pdf_file.trailer.parsed_content["Root"], Reference(1, 0))
+
 
 if __name__ == '__main__':
     unittest.main()